@@ -362,14 +362,18 @@ def add_text_overlay(
         return False
 
 
-def main():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Add text overlay to illustrations using word data from generate_word_list.py.")
     parser.add_argument("--input-dir", default="illustrations", help="Input directory with illustration images.")
     parser.add_argument("--words-json", required=True, help="Path to words JSON file.")
     parser.add_argument("--output-dir", default="illustrations_with_text", help="Output directory for images with text overlay.")
     parser.add_argument("--font-size", type=int, default=24, help="Font size for text.")
     parser.add_argument("--padding", type=int, default=40, help="Padding around text.")
-    args = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Add text overlays for already parsed command-line arguments."""
 
     input_dir = args.input_dir
     words_json = args.words_json
@@ -467,5 +471,9 @@ def main():
             add_text_overlay(input_path, word, output_path, words_data, font_size=font_size, padding=padding)
 
 
+def main():
+    run(parse_args())
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -14,6 +14,29 @@ Usage:
 import os
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _remove_directory(dir_path):
+    """Remove a directory tree. Returns True on success."""
+    try:
+        shutil.rmtree(dir_path)
+        print(f"✅ Removed directory: {dir_path}")
+        return True
+    except Exception as e:
+        print(f"❌ Error removing directory {dir_path}: {e}")
+        return False
+
+
+def _remove_file(file_path):
+    """Remove a single file. Returns True on success."""
+    try:
+        os.remove(file_path)
+        print(f"✅ Removed file: {file_path}")
+        return True
+    except Exception as e:
+        print(f"❌ Error removing file {file_path}: {e}")
+        return False
 
 
 def cleanup():
@@ -29,31 +52,23 @@ def cleanup():
     script_files_to_remove = []
     scripts_dir = "scripts"
     if os.path.exists(scripts_dir):
-        for f in os.listdir(scripts_dir):
-            if f.startswith("words_") and f.endswith(".json"):
-                script_files_to_remove.append(os.path.join(scripts_dir, f))
+        with os.scandir(scripts_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith("words_") and entry.name.endswith(".json"):
+                    script_files_to_remove.append(entry.path)
     
-    # Remove directories
-    removed_count = 0
+    existing_dirs = []
     for dir_path in dirs_to_remove:
         if os.path.exists(dir_path):
-            try:
-                shutil.rmtree(dir_path)
-                print(f"✅ Removed directory: {dir_path}")
-                removed_count += 1
-            except Exception as e:
-                print(f"❌ Error removing directory {dir_path}: {e}")
+            existing_dirs.append(dir_path)
         else:
             print(f"⚠️ Directory not found: {dir_path}")
     
-    # Remove script files
-    for file_path in script_files_to_remove:
-        try:
-            os.remove(file_path)
-            print(f"✅ Removed file: {file_path}")
-            removed_count += 1
-        except Exception as e:
-            print(f"❌ Error removing file {file_path}: {e}")
+    # Remove directories and script files concurrently (deletion is IO-bound)
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        dir_results = ex.map(_remove_directory, existing_dirs)
+        file_results = ex.map(_remove_file, script_files_to_remove)
+        removed_count = sum(dir_results) + sum(file_results)
     
     # Recreate empty directories
     for dir_path in dirs_to_remove:
@@ -0,0 +1,51 @@
+"""
+gemini_cache.py
+
+Small on-disk cache for Gemini text responses shared by `generate_word_list.py` and
+`verify_grammar.py`. Entries are keyed by SHA-256 of the model name and prompt, so re-running
+a stage with the same inputs returns the previous response without calling the API.
+
+Delete the `.cache/gemini/` directory to force fresh responses.
+"""
+import hashlib
+import os
+import threading
+
+from gemini_json import json_dumps, json_loads
+
+CACHE_DIR = os.path.join(".cache", "gemini")
+
+
+def _cache_path(model: str, prompt: str) -> str:
+    key = hashlib.sha256((model + "|" + prompt).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def write_atomic(path: str, data: bytes):
+    """Write bytes to `path` via a temporary file, so concurrent readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def cache_lookup(model: str, prompt: str) -> str | None:
+    """Return the cached response text for this model/prompt, or None on a cache miss."""
+    try:
+        with open(_cache_path(model, prompt), "rb") as f:
+            entry = json_loads(f.read())
+    except (OSError, ValueError):
+        return None
+    response = entry.get("response") if isinstance(entry, dict) else None
+    return response if isinstance(response, str) else None
+
+
+def cache_store(model: str, prompt: str, response: str):
+    """Save a response so identical prompts skip the API next time. Failures are only reported."""
+    cache_path = _cache_path(model, prompt)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        entry = {"model": model, "prompt": prompt, "response": response}
+        write_atomic(cache_path, json_dumps(entry))
+    except OSError as e:
+        print(f"⚠️ Could not write cache entry {cache_path}: {e}")
@@ -0,0 +1,47 @@
+"""
+gemini_http.py
+
+HTTP transport settings shared by every `genai.Client` the scripts create. Concurrent requests (the
+threaded illustration fetches and the async grammar verification) reuse a larger keep-alive pool,
+and with the optional `h2` package installed they are multiplexed over one HTTP/2 connection.
+"""
+try:
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    _HAS_H2 = True
+except ImportError:
+    _HAS_H2 = False
+
+try:
+    # google-genai switches its async transport from httpx to aiohttp when aiohttp is installed
+    import aiohttp  # noqa: F401
+    _HAS_AIOHTTP = True
+except ImportError:
+    _HAS_AIOHTTP = False
+
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+
+def http_options():
+    """Return `types.HttpOptions` tuning the httpx transports, or None if the SDK cannot take them."""
+    import httpx
+    import pydantic
+    from google.genai import types
+
+    httpx_args = {
+        "http2": _HAS_H2,
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    }
+    # The sync transport is always httpx; the async one only without aiohttp, which would reject
+    # httpx-only arguments such as `http2` and `limits`
+    options = {"client_args": httpx_args}
+    if not _HAS_AIOHTTP:
+        options["async_client_args"] = dict(httpx_args)
+    try:
+        return types.HttpOptions(**options)
+    except pydantic.ValidationError:
+        # Older google-genai releases have no client_args/async_client_args fields
+        return None
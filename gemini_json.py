@@ -0,0 +1,72 @@
+"""
+gemini_json.py
+
+JSON helpers shared by the pipeline scripts: fast parsing/serialization via `orjson` when it is
+installed (falling back to the standard `json` module), and an incremental scanner that pulls
+complete JSON objects out of streamed Gemini responses.
+"""
+import json
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes, using orjson when it is installed."""
+    if _HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes, using orjson when it is installed."""
+    if _HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+class JsonObjectScanner:
+    """Incrementally extract complete top-level JSON objects from streamed text.
+
+    Feed chunks as they arrive; each call returns the objects completed so far. Brackets, markdown
+    fences and other text between objects are ignored, so a streamed JSON array yields its elements.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> list:
+        objects = []
+        for ch in text:
+            if self._depth == 0:
+                if ch != '{':
+                    continue
+                self._buffer = []
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json_loads("".join(self._buffer))
+                    except ValueError:
+                        continue
+                    if isinstance(obj, dict):
+                        objects.append(obj)
+        return objects
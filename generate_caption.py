@@ -8,6 +8,8 @@ import argparse
 import os
 import sys
 
+from gemini_http import http_options
+
 try:
     from dotenv import load_dotenv
     _HAS_DOTENV = True
@@ -39,8 +41,8 @@ def get_genai_client():
     
     try:
         if api_key:
-            return genai.Client(api_key=api_key)
-        return genai.Client()
+            return genai.Client(api_key=api_key, http_options=http_options())
+        return genai.Client(http_options=http_options())
     except Exception as e:
         print(f"⚠️  genai.Client() initialization failed: {e}")
         return None
@@ -62,8 +64,9 @@ FALLBACK_CAPTIONS = {
     )
 }
 
-def generate_caption(topic, model="gemini-2.5-flash"):
-    client = get_genai_client()
+def generate_caption(topic, model="gemini-2.5-flash", client=None):
+    if client is None:
+        client = get_genai_client()
     if not client:
         print("⚠️  Gemini client not available. Using fallback caption.")
         return FALLBACK_CAPTIONS.get(topic, FALLBACK_CAPTIONS["default"])
@@ -96,16 +99,20 @@ def generate_caption(topic, model="gemini-2.5-flash"):
     return FALLBACK_CAPTIONS.get(topic, FALLBACK_CAPTIONS["default"])
 
 
-def main():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Generate TikTok captions.")
     parser.add_argument("--topic", required=True, help="Topic of the content")
     parser.add_argument("--output", help="Output file to save the caption")
     parser.add_argument("--model", default="gemini-2.5-flash", help="Gemini model to use")
     
-    args = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def run(args, client=None):
+    """Generate and optionally save a caption. An existing Gemini client can be passed in to reuse it."""
     
     print(f"✍️  Generating caption for topic: '{args.topic}'...")
-    caption = generate_caption(args.topic, args.model)
+    caption = generate_caption(args.topic, args.model, client=client)
     
     if caption:
         print("\n✨ Generated Caption:\n")
@@ -125,5 +132,9 @@ def main():
         sys.exit(1)
 
 
+def main():
+    run(parse_args())
+
+
 if __name__ == "__main__":
     main()
@@ -1,33 +1,61 @@
 import argparse
+import functools
+import hashlib
 import os
 import json
+import multiprocessing
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from io import BytesIO
 from typing import List
-from PIL import Image
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 
-# --- Load environment variables ---
-load_dotenv()
+from gemini_cache import write_atomic
+from gemini_json import json_dumps, json_loads
+
+# Heavy dependencies (PIL, numpy, google.genai, dotenv) are imported inside the functions that use
+# them so `--help` and argument errors return without paying their import cost.
 
 # --- Gemini Client Initialization ---
-# The client automatically looks for the GEMINI_API_KEY environment variable.
-try:
-    # Initialize client once
-    client = genai.Client()
-    print("✅ Gemini client initialized.")
-except Exception as e:
-    print(f"❌ Error initializing Gemini client: {e}")
-    print("Please ensure you have set the GEMINI_API_KEY environment variable.")
-    # Exit if the client cannot be initialized due to missing key or other error
-    exit()
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client():
+    """Return the shared Gemini client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from dotenv import load_dotenv
+            from google import genai
+
+            from gemini_http import http_options
+
+            # --- Load environment variables ---
+            load_dotenv()
+
+            # The client automatically looks for the GEMINI_API_KEY environment variable.
+            try:
+                _client = genai.Client(http_options=http_options())
+                print("✅ Gemini client initialized.")
+            except Exception as e:
+                print(f"❌ Error initializing Gemini client: {e}")
+                print("Please ensure you have set the GEMINI_API_KEY environment variable.")
+                # Exit if the client cannot be initialized due to missing key or other error
+                exit()
+    return _client
 
 # --- Configuration ---
 INPUT_DIR = "scripts"
 OUTPUT_DIR = "illustrations"
+CACHE_DIR = "cache"
 MODEL_NAME = "gemini-2.5-flash-image"
+# zlib level for saved PNGs: 1 encodes several times faster than the default 6 for a modest size increase
+PNG_COMPRESS_LEVEL = 1
+
+# Compiled once for _sanitize_filename, which runs several times per word
+_WHITESPACE_RE = re.compile(r"\s+")
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r"[^a-z0-9_\-]")
 
 # --- Fixed illustration style description ---
 ILLUSTRATION_STYLE = (
@@ -36,6 +64,67 @@ ILLUSTRATION_STYLE = (
 
 ## 🏗️ Core Functions
 
+### 0. JSON & Cache Helpers
+
+def _cache_path(prompt: str, aspect_ratio: str) -> str:
+    """Return the cache file path for a prompt/aspect ratio pair."""
+    key = hashlib.blake2b(prompt.encode("utf-8") + aspect_ratio.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.png")
+
+
+def _cache_lookup(prompt: str, aspect_ratio: str) -> bytes | None:
+    """Return previously generated image bytes for this prompt, or None on a cache miss."""
+    try:
+        with open(_cache_path(prompt, aspect_ratio), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _cache_store(prompt: str, aspect_ratio: str, image_data: bytes):
+    """Save raw image bytes returned by the model so identical prompts skip the API next time."""
+    cache_path = _cache_path(prompt, aspect_ratio)
+    try:
+        write_atomic(cache_path, image_data)
+    except OSError as e:
+        print(f"⚠️ Could not write cache entry {cache_path}: {e}")
+
+
+def _write_png(image, image_data: bytes, output_path: str):
+    """Save an unmodified model image as PNG.
+    PNG responses are written straight to disk, skipping a decode/re-encode cycle; other formats are converted.
+    """
+    if image.format == "PNG":
+        with open(output_path, "wb") as f:
+            f.write(image_data)
+    else:
+        import numpy as np
+
+        _save_png(np.asarray(image.convert("RGB")), output_path)
+
+
+@functools.lru_cache(maxsize=1)
+def _pyspng_encode():
+    """Return pyspng's PNG encoder, or None if it is unavailable. Checked once per process."""
+    try:
+        import pyspng
+    except ImportError:
+        return None
+    # Released pyspng versions only decode (`load`); encoding needs a build that exports `encode`
+    return getattr(pyspng, "encode", None)
+
+
+def _save_png(pixels, output_path: str):
+    """Encode an RGB pixel array as PNG, using pyspng's faster encoder when it provides one."""
+    encode = _pyspng_encode()
+    if encode is not None:
+        with open(output_path, "wb") as f:
+            f.write(encode(pixels, compress_level=PNG_COMPRESS_LEVEL))
+    else:
+        from PIL import Image
+
+        Image.fromarray(pixels).save(output_path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+
 ### 1. Prompt Generation
 
 def create_generic_prompt(data: dict) -> str:
@@ -54,20 +143,16 @@ def create_generic_prompt(data: dict) -> str:
     characters = idea.get("characters", [])
     
     # --- MODIFICATION START: Extract and format detailed character descriptions ---
-    character_descriptions = []
-    for char in characters:
-        name = char.get("name", "Unnamed")
-        gender = char.get("gender", "unspecified gender")
-        age = char.get("age", "unspecified age")
-        character_descriptions.append(f"{name} ({gender}, {age})")
-    
-    detailed_characters_list = "; ".join(character_descriptions)
+    detailed_characters_list = "; ".join(
+        f"{char.get('name', 'Unnamed')} ({char.get('gender', 'unspecified gender')}, {char.get('age', 'unspecified age')})"
+        for char in characters
+    )
     # --- MODIFICATION END ---
 
-    # Sample dialogue preview
-    all_lines = " ".join([d.get("text", "") for d in dialogues])
-    sample_dialogue_words = all_lines.split()[:40]
-    sample_dialogue = " ".join(sample_dialogue_words) + ("..." if len(all_lines.split()) > 40 else "")
+    # Sample dialogue preview (split once and reuse the word list)
+    all_lines = " ".join(d.get("text", "") for d in dialogues)
+    dialogue_words = all_lines.split()
+    sample_dialogue = " ".join(dialogue_words[:40]) + ("..." if len(dialogue_words) > 40 else "")
 
     # Build generic illustration prompt
     prompt = (
@@ -89,10 +174,15 @@ def generate_illustration_from_json(json_path: str, aspect_ratio: str = "9:16"):
 
     :param json_path: Path to the input JSON file.
     :param aspect_ratio: The desired aspect ratio for the generated image.
+
+    OUTPUT_DIR and CACHE_DIR must already exist (main() creates them).
     """
+    from PIL import Image
+    from google.genai import types
+
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(json_path, "rb") as f:
+            data = json_loads(f.read())
     except FileNotFoundError:
         print(f"❌ Error: File not found at {json_path}")
         return
@@ -104,84 +194,93 @@ def generate_illustration_from_json(json_path: str, aspect_ratio: str = "9:16"):
     print(f"\n🎨 Generating illustration for: {os.path.basename(json_path)}")
     print(f"➡️ Prompt for image generation:\n{prompt[:250]}...\n") # Print a snippet of the new prompt
 
-    # --- GenerateContentConfig ---
-    # Configure the response to request an image modality and set the aspect ratio.
-    config = types.GenerateContentConfig(
-        response_modalities=[types.Modality.IMAGE],
-        image_config=types.ImageConfig(
-            aspect_ratio=aspect_ratio,
+    cached_image = _cache_lookup(prompt, aspect_ratio)
+    if cached_image is not None:
+        print(f"♻️ Using cached illustration for {os.path.basename(json_path)}")
+        image_parts = [cached_image]
+    else:
+        # --- GenerateContentConfig ---
+        # Configure the response to request an image modality and set the aspect ratio.
+        config = types.GenerateContentConfig(
+            response_modalities=[types.Modality.IMAGE],
+            image_config=types.ImageConfig(
+                aspect_ratio=aspect_ratio,
+            )
         )
-    )
 
-    try:
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=[prompt],
-            config=config
-        )
-    except Exception as e:
-        print(f"❌ API Error during generation for {os.path.basename(json_path)}: {e}")
-        return
+        try:
+            response = _get_client().models.generate_content(
+                model=MODEL_NAME,
+                contents=[prompt],
+                config=config
+            )
+        except Exception as e:
+            print(f"❌ API Error during generation for {os.path.basename(json_path)}: {e}")
+            return
 
-    # Check 1: Ensure candidates were generated at all.
-    if not response.candidates:
-        print(f"⚠️ **Response failed to generate candidates** for {os.path.basename(json_path)}.")
-        if response.prompt_feedback.block_reason:
-            print(f"   Reason: Content was blocked due to {response.prompt_feedback.block_reason}.")
-        else:
-            print("   Reason: Unknown failure. Check prompt safety or API logs.")
-        return
+        # Check 1: Ensure candidates were generated at all.
+        if not response.candidates:
+            print(f"⚠️ **Response failed to generate candidates** for {os.path.basename(json_path)}.")
+            if response.prompt_feedback.block_reason:
+                print(f"   Reason: Content was blocked due to {response.prompt_feedback.block_reason}.")
+            else:
+                print("   Reason: Unknown failure. Check prompt safety or API logs.")
+            return
 
-    # Check 2 (The Fix): Ensure the content object exists to avoid AttributeError.
-    first_candidate = response.candidates[0]
-    if first_candidate.content is None:
-        print(f"⚠️ **Candidate content is None** for {os.path.basename(json_path)}. Likely due to a safety block on the *output*.")
-        finish_reason = first_candidate.finish_reason.name if first_candidate.finish_reason else 'Unknown'
-        print(f"   Candidate Finish Reason: {finish_reason}.")
-        print("   Try simplifying the scene description or checking API safety guidelines.")
-        return
+        # Check 2 (The Fix): Ensure the content object exists to avoid AttributeError.
+        first_candidate = response.candidates[0]
+        if first_candidate.content is None:
+            print(f"⚠️ **Candidate content is None** for {os.path.basename(json_path)}. Likely due to a safety block on the *output*.")
+            finish_reason = first_candidate.finish_reason.name if first_candidate.finish_reason else 'Unknown'
+            print(f"   Candidate Finish Reason: {finish_reason}.")
+            print("   Try simplifying the scene description or checking API safety guidelines.")
+            return
+
+        image_parts = [part.inline_data.data for part in first_candidate.content.parts if part.inline_data is not None]
 
     # Extract and save image(s)
-    for part in first_candidate.content.parts:
-        if part.inline_data is not None:
-            image_data = part.inline_data.data
+    for image_data in image_parts:
+        try:
+            image = Image.open(BytesIO(image_data))
+        except Exception as e:
+            print(f"❌ Error opening image data for {os.path.basename(json_path)}: {e}")
+            continue
 
-            try:
-                image = Image.open(BytesIO(image_data))
-            except Exception as e:
-                print(f"❌ Error opening image data for {os.path.basename(json_path)}: {e}")
-                continue
+        if image_data is not cached_image:
+            _cache_store(prompt, aspect_ratio, image_data)
 
-            os.makedirs(OUTPUT_DIR, exist_ok=True)
-            # --- MODIFICATION START (Preserved existing logic) ---
-            base_filename = os.path.splitext(os.path.basename(json_path))[0]
-            output_filename = "conversation_" + base_filename + ".png"
-            # --- MODIFICATION END ---
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
+        # --- MODIFICATION START (Preserved existing logic) ---
+        base_filename = os.path.splitext(os.path.basename(json_path))[0]
+        output_filename = "conversation_" + base_filename + ".png"
+        # --- MODIFICATION END ---
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
 
-            image.save(output_path)
-            print(f"✅ Image saved to {output_path}")
-            return # Assuming only one image is desired per script
+        _write_png(image, image_data, output_path)
+        print(f"✅ Image saved to {output_path}")
+        return # Assuming only one image is desired per script
 
     print(f"⚠️ No image data found in model response parts for {os.path.basename(json_path)}. Check API logs.")
 
 
 def _sanitize_filename(s: str) -> str:
-    s = s.strip().lower()
-    s = re.sub(r"\s+", "_", s)
-    s = re.sub(r"[^a-z0-9_\-]", "", s)
+    s = _WHITESPACE_RE.sub("_", s.strip().lower())
+    s = _UNSAFE_FILENAME_CHARS_RE.sub("", s)
     return s or "word"
 
 
-def generate_illustration_from_word(word: str, topic: str | None = None, aspect_ratio: str = "9:16"):
-    """Generate an illustration for a single Finnish word.
-    Creates a direct, object-focused prompt tailored for concrete/abstract objects without dialogue.
-    The illustration is generated as a square and then placed in the center of a 9:16 white canvas.
-    """
+def _word_output_filename(word: str, topic: str | None = None) -> str:
+    """Return the illustration filename used for a word (also recorded in mapping.json)."""
+    safe = _sanitize_filename(word)
+    topic_fragment = f"_{_sanitize_filename(topic)}" if topic else ""
+    return f"word_{safe}{topic_fragment}.png"
+
+
+def create_word_prompt(word: str, topic: str | None = None) -> str:
+    """Create a direct, object-focused illustration prompt for a single word."""
     # Build a direct prompt focused on the word/object itself, not a scene with characters or dialogue
     # Topic word illustration comes first to ensure it's the primary focus
     topic_prefix = f"{topic} illustration: " if topic else ""
-    prompt = (
+    return (
         f"{topic_prefix}Create a visually engaging digital illustration of the Finnish word '{word}'. "
         f"{ILLUSTRATION_STYLE} "
         f"Do not include any text, captions in the image. "
@@ -190,91 +289,275 @@ def generate_illustration_from_word(word: str, topic: str | None = None, aspect_
         f"The image should be a single, clean, minimalist illustration that clearly represents the meaning of '{word}'. "
         f"Use a vibrant, balanced color palette and modern flat design style. "
     )
+
+
+def create_word_batch_prompt(words: list, topic: str | None = None) -> str:
+    """Create one prompt asking for a separate illustration of each word, in order."""
+    topic_prefix = f"{topic} illustrations: " if topic else ""
+    numbered_words = " ".join(f"{i}. '{w}'" for i, w in enumerate(words, 1))
+    return (
+        f"{topic_prefix}Create {len(words)} separate digital illustrations, one image per Finnish word, "
+        f"returned in exactly this order: {numbered_words}. "
+        f"{ILLUSTRATION_STYLE} "
+        f"Do not include any text, captions or numbers in the images. "
+        f"Each image should be a single, clean, minimalist illustration with the object or concept prominently centered "
+        f"and generous whitespace or soft background around it. "
+        f"Use a vibrant, balanced color palette and modern flat design style. "
+    )
+
+
+def _fetch_bytes(word: str, topic: str | None = None, aspect_ratio: str = "1:1") -> bytes | None:
+    """Fetch the raw illustration for a word from the cache or the Gemini API.
+    This is the network-bound half of generate_illustration_from_word.
+    aspect_ratio is the ratio requested from the model (square unless compositing is disabled).
+    Returns the encoded image bytes, or None if no image could be generated.
+    """
+    from PIL import Image
+    from google.genai import types
+
+    prompt = create_word_prompt(word, topic)
     print(f"\n🎨 Generating illustration for word: {word}")
     print(f"➡️ Prompt: {prompt[:200]}...")
 
-    # Request a square aspect ratio for the illustration
+    cached_image = _cache_lookup(prompt, aspect_ratio)
+    if cached_image is not None:
+        print(f"♻️ Using cached illustration for word: {word}")
+        return cached_image
+
     config = types.GenerateContentConfig(
         response_modalities=[types.Modality.IMAGE],
-        image_config=types.ImageConfig(aspect_ratio="1:1"),
+        image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
     )
 
     try:
-        response = client.models.generate_content(model=MODEL_NAME, contents=[prompt], config=config)
+        response = _get_client().models.generate_content(model=MODEL_NAME, contents=[prompt], config=config)
     except Exception as e:
         print(f"❌ API Error during generation for word '{word}': {e}")
-        return
+        return None
 
     if not response.candidates:
         print(f"⚠️ No candidates generated for word '{word}'")
-        return
+        return None
 
     first_candidate = response.candidates[0]
     if first_candidate.content is None:
         print(f"⚠️ Candidate content is None for word '{word}'. Likely safety block.")
-        return
+        return None
 
     for part in first_candidate.content.parts:
         if part.inline_data is not None:
             image_data = part.inline_data.data
             try:
-                square_image = Image.open(BytesIO(image_data))
+                # Only reads the header, so this is a cheap validity check before caching
+                Image.open(BytesIO(image_data))
             except Exception as e:
                 print(f"❌ Error opening image data for word '{word}': {e}")
                 continue
 
-            # Parse the target aspect ratio to determine canvas dimensions
-            # Default to 9:16, but respect the aspect_ratio parameter if provided
-            ratio_parts = aspect_ratio.split(":")
-            try:
-                ratio_width = int(ratio_parts[0])
-                ratio_height = int(ratio_parts[1])
-            except (ValueError, IndexError):
-                ratio_width, ratio_height = 9, 16
-
-            # Create a high-resolution white canvas with the desired aspect ratio
-            # Use 720px width as base for better quality
-            canvas_width = 720
-            canvas_height = int(canvas_width * ratio_height / ratio_width)
-            canvas = Image.new("RGB", (canvas_width, canvas_height), color="white")
-
-            # Resize the square illustration to fit within the canvas (leaving margins)
-            margin = 40
-            max_size = canvas_width - (2 * margin)
-            square_image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-
-            # Calculate position to center the square image
-            x_offset = (canvas_width - square_image.width) // 2
-            y_offset = (canvas_height - square_image.height) // 2
-
-            # Paste the square image onto the white canvas
-            canvas.paste(square_image, (x_offset, y_offset))
-
-            os.makedirs(OUTPUT_DIR, exist_ok=True)
-            safe = _sanitize_filename(word)
-            topic_fragment = f"_{_sanitize_filename(topic)}" if topic else ""
-            output_filename = f"word_{safe}{topic_fragment}.png"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-
-            canvas.save(output_path, quality=95)
-            print(f"✅ Image saved to {output_path} ({canvas_width}x{canvas_height}px)")
-            return
+            _cache_store(prompt, aspect_ratio, image_data)
+            return image_data
 
     print(f"⚠️ No image data found in model response parts for word '{word}'.")
+    return None
 
-def main():
-    """Main function to process all JSON scripts and generate illustrations."""
+
+def _fetch_batch_bytes(words: list, topic: str | None = None, aspect_ratio: str = "1:1") -> list:
+    """Fetch illustrations for several words with a single API call where possible.
+    Cached words are served from disk; the remaining words are combined into one prompt and the
+    returned images are matched to words by position. If the model does not return exactly one
+    image per word, the uncached words are fetched one call at a time instead.
+    Returns a list of image bytes (or None) aligned with words.
+    """
+    from PIL import Image
+    from google.genai import types
+
+    results = [_cache_lookup(create_word_prompt(word, topic), aspect_ratio) for word in words]
+    missing = [i for i, image_data in enumerate(results) if image_data is None]
+    for i, image_data in enumerate(results):
+        if image_data is not None:
+            print(f"♻️ Using cached illustration for word: {words[i]}")
+
+    if len(missing) <= 1:
+        for i in missing:
+            results[i] = _fetch_bytes(words[i], topic, aspect_ratio)
+        return results
+
+    batch_words = [words[i] for i in missing]
+    print(f"\n🎨 Generating {len(batch_words)} illustrations in one request: {', '.join(batch_words)}")
+
+    config = types.GenerateContentConfig(
+        response_modalities=[types.Modality.IMAGE],
+        image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
+    )
+
+    images = []
+    try:
+        response = _get_client().models.generate_content(
+            model=MODEL_NAME, contents=[create_word_batch_prompt(batch_words, topic)], config=config
+        )
+        if response.candidates and response.candidates[0].content is not None:
+            for part in response.candidates[0].content.parts:
+                if part.inline_data is not None:
+                    images.append(part.inline_data.data)
+    except Exception as e:
+        print(f"⚠️ Batched request failed for {', '.join(batch_words)}: {e}")
+
+    if len(images) != len(batch_words):
+        print(f"⚠️ Batched request returned {len(images)} image(s) for {len(batch_words)} words. Falling back to one request per word.")
+        for i in missing:
+            results[i] = _fetch_bytes(words[i], topic, aspect_ratio)
+        return results
+
+    for i, image_data in zip(missing, images):
+        try:
+            Image.open(BytesIO(image_data))
+        except Exception as e:
+            print(f"❌ Error opening image data for word '{words[i]}': {e}")
+            results[i] = _fetch_bytes(words[i], topic, aspect_ratio)
+            continue
+        # Cached under the single-word prompt so later runs pick it up with or without batching
+        _cache_store(create_word_prompt(words[i], topic), aspect_ratio, image_data)
+        results[i] = image_data
+    return results
+
+
+@functools.lru_cache(maxsize=8)
+def _white_template(width: int, height: int):
+    """Return a shared white RGB canvas buffer (callers must copy it before drawing)."""
+    import numpy as np
+
+    template = np.full((height, width, 3), 255, dtype=np.uint8)
+    template.flags.writeable = False
+    return template
+
+
+def _postprocess_and_save(
+    image_data: bytes,
+    word: str,
+    topic: str | None = None,
+    aspect_ratio: str = "9:16",
+    center_on_canvas: bool = True,
+) -> bool:
+    """Center a square illustration on a white canvas of the target aspect ratio and save it.
+    With center_on_canvas=False the image already has the target aspect ratio and is saved as-is.
+    This is the CPU-bound half of generate_illustration_from_word and is safe to run in a worker process.
+    Returns True if the image was saved.
+    """
+    import numpy as np
+    from PIL import Image
+
+    try:
+        square_image = Image.open(BytesIO(image_data))
+        if center_on_canvas:
+            square_image.load()
+    except Exception as e:
+        print(f"❌ Error opening image data for word '{word}': {e}")
+        return False
+
+    if not center_on_canvas:
+        output_path = os.path.join(OUTPUT_DIR, _word_output_filename(word, topic))
+        _write_png(square_image, image_data, output_path)
+        print(f"✅ Image saved to {output_path} ({square_image.width}x{square_image.height}px)")
+        return True
+
+    # Parse the target aspect ratio to determine canvas dimensions
+    # Default to 9:16, but respect the aspect_ratio parameter if provided
+    ratio_parts = aspect_ratio.split(":")
+    try:
+        ratio_width = int(ratio_parts[0])
+        ratio_height = int(ratio_parts[1])
+    except (ValueError, IndexError):
+        ratio_width, ratio_height = 9, 16
+
+    # Create a high-resolution white canvas with the desired aspect ratio
+    # Use 720px width as base for better quality
+    canvas_width = 720
+    canvas_height = int(canvas_width * ratio_height / ratio_width)
+
+    # Resize the square illustration to fit within the canvas (leaving margins); landscape canvases
+    # are shorter than they are wide, so the height bounds the size too
+    margin = 40
+    max_size = max(1, min(canvas_width, canvas_height) - (2 * margin))
+    scale = min(max_size / square_image.width, max_size / square_image.height, 1.0)
+    inner_width = max(1, round(square_image.width * scale))
+    inner_height = max(1, round(square_image.height * scale))
+    inner = square_image.convert("RGB").resize((inner_width, inner_height), Image.Resampling.LANCZOS)
+
+    # Calculate position to center the square image
+    x_offset = (canvas_width - inner_width) // 2
+    y_offset = (canvas_height - inner_height) // 2
+
+    # Blit the square image onto a copy of the white canvas template in a single slice assignment
+    pixels = _white_template(canvas_width, canvas_height).copy()
+    pixels[y_offset:y_offset + inner_height, x_offset:x_offset + inner_width] = np.asarray(inner)
+
+    output_path = os.path.join(OUTPUT_DIR, _word_output_filename(word, topic))
+
+    _save_png(pixels, output_path)
+    print(f"✅ Image saved to {output_path} ({canvas_width}x{canvas_height}px)")
+    return True
+
+
+def generate_illustration_from_word(
+    word: str,
+    topic: str | None = None,
+    aspect_ratio: str = "9:16",
+    center_on_canvas: bool = True,
+):
+    """Generate an illustration for a single Finnish word.
+    Creates a direct, object-focused prompt tailored for concrete/abstract objects without dialogue.
+    The illustration is generated as a square and then placed in the center of a 9:16 white canvas.
+    With center_on_canvas=False the model is asked for the target aspect ratio directly and no compositing is done.
+    OUTPUT_DIR and CACHE_DIR must already exist (main() creates them).
+    """
+    model_aspect_ratio = "1:1" if center_on_canvas else aspect_ratio
+    image_data = _fetch_bytes(word, topic, model_aspect_ratio)
+    if image_data is None:
+        return
+    _postprocess_and_save(image_data, word, topic, aspect_ratio, center_on_canvas)
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Generate illustrations from script JSON files or a words JSON list.")
     parser.add_argument("--words-json", help="Path to a JSON file containing an array of words. One illustration will be generated per word.")
     parser.add_argument("--topic", help="Optional topic name used in per-word prompts.")
     parser.add_argument("--aspect", default="9:16", help="Aspect ratio passed to the image generator (default 9:16).")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--center-on-canvas",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Generate square word illustrations and center them on a white canvas of the target aspect ratio (default). "
+             "Use --no-center-on-canvas to request the target aspect ratio from the model and skip compositing.",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of illustrations to generate in parallel (default 8).")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Ask for up to this many word illustrations per API request (default 1). "
+             "Falls back to one request per word if the model does not return one image per word.",
+    )
+    return parser.parse_args(argv)
+
+
+def run(args, client=None):
+    """Generate illustrations for already parsed arguments. An existing Gemini client can be passed in to reuse it."""
+
+    global _client
+    if client is not None:
+        _client = client
+
+    # Initialize the client up front so a missing API key fails before any work is dispatched
+    _get_client()
+
+    # Create output directories once here; the per-image functions assume they exist
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(CACHE_DIR, exist_ok=True)
 
     # If a words JSON is provided, generate one illustration per word and exit.
     if args.words_json:
         try:
-            with open(args.words_json, "r", encoding="utf-8") as f:
-                words = json.load(f)
+            with open(args.words_json, "rb") as f:
+                words = json_loads(f.read())
                 if not isinstance(words, list):
                     print(f"⚠️ {args.words_json} does not contain a JSON array of words.")
                     return
@@ -285,46 +568,94 @@ def main():
             print(f"❌ Invalid JSON in {args.words_json}")
             return
 
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        
         # Create mapping file to track word->image associations
-        mapping = []
+        # Pre-sized so worker threads never touch the list; entries are filled in by index
+        mapping = [None] * len(words)
+        model_aspect_ratio = "1:1" if args.center_on_canvas else args.aspect
         
-        for idx, w in enumerate(words):
-            word_obj = w if isinstance(w, dict) else {'word': str(w)}
-            word = word_obj.get('word', str(w))
+        # API calls are network-bound, so fetch on threads; resizing and PNG encoding are
+        # CPU-bound, so hand each fetched image to a process pool as soon as it arrives.
+        # Workers are spawned rather than forked: forking while fetch threads run can deadlock the child.
+        # Without compositing, saving only writes the returned bytes, so one thread is enough.
+        if args.center_on_canvas:
+            save_ex = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        else:
+            save_ex = ThreadPoolExecutor(max_workers=1)
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as fetch_ex, save_ex:
+            # Words that sanitize to the same filename would overwrite each other's image,
+            # so only the first one is generated and the duplicates share its file in the mapping
+            seen = {}
+            for idx, w in enumerate(words):
+                word_obj = w if isinstance(w, dict) else {'word': str(w)}
+                word = word_obj.get('word', str(w))
+                output_filename = _word_output_filename(word, args.topic)
+                
+                if output_filename in seen:
+                    print(f"♻️ Skipping duplicate word '{word}' (reusing {output_filename})")
+                else:
+                    seen[output_filename] = word
+                
+                # Record the mapping
+                mapping[idx] = {
+                    "index": idx,
+                    "word": word,
+                    "filename": output_filename
+                }
+            word_list = list(seen.values())
             
-            safe = _sanitize_filename(word)
-            topic_fragment = f"_{_sanitize_filename(args.topic)}" if args.topic else ""
-            output_filename = f"word_{safe}{topic_fragment}.png"
+            # Group words into batches (one word per request unless --batch-size is raised)
+            batch_size = max(1, args.batch_size)
+            fetch_futures = {}
+            for start in range(0, len(word_list), batch_size):
+                batch = word_list[start:start + batch_size]
+                future = fetch_ex.submit(_fetch_batch_bytes, batch, args.topic, model_aspect_ratio)
+                fetch_futures[future] = batch
             
-            generate_illustration_from_word(word, topic=args.topic, aspect_ratio=args.aspect)
+            save_futures = {}
+            for future in as_completed(fetch_futures):
+                batch = fetch_futures[future]
+                try:
+                    batch_images = future.result()
+                except Exception as e:
+                    print(f"❌ Unexpected error generating illustrations for {', '.join(batch)}: {e}")
+                    continue
+                for word, image_data in zip(batch, batch_images):
+                    if image_data is None:
+                        continue
+                    save_future = save_ex.submit(
+                        _postprocess_and_save, image_data, word, args.topic, args.aspect, args.center_on_canvas
+                    )
+                    save_futures[save_future] = word
             
-            # Record the mapping
-            mapping.append({
-                "index": idx,
-                "word": word,
-                "filename": output_filename
-            })
+            for future in as_completed(save_futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Unexpected error saving illustration for word '{save_futures[future]}': {e}")
         
         # Save mapping file
         mapping_path = os.path.join(OUTPUT_DIR, "mapping.json")
-        with open(mapping_path, "w", encoding="utf-8") as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=2)
+        with open(mapping_path, "wb") as f:
+            f.write(json_dumps(mapping))
         print(f"✅ Saved word->image mapping to {mapping_path}")
         return
 
     # Default behavior: process JSON files in the scripts/ directory
     os.makedirs(INPUT_DIR, exist_ok=True)
-    files = [f for f in os.listdir(INPUT_DIR) if f.endswith(".json")]
+    with os.scandir(INPUT_DIR) as entries:
+        files = [e.path for e in entries if e.is_file() and e.name.endswith(".json")]
     if not files:
         print(f"⚠️ No JSON files found in {INPUT_DIR}/. Create some script JSON files to begin.")
         return
 
-    for file in files:
-        json_path = os.path.join(INPUT_DIR, file)
+    for json_path in files:
         generate_illustration_from_json(json_path, aspect_ratio=args.aspect)
 
 
+def main():
+    """Main function to process all JSON scripts and generate illustrations."""
+    run(parse_args())
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
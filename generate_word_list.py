@@ -16,39 +16,70 @@ Environment:
     vocabulary for common topics so you can continue working offline.
 """
 import argparse
-import json
+import functools
 import os
+import re
 import sys
 from typing import List
+
+from gemini_cache import cache_lookup, cache_store
+from gemini_http import http_options
+from gemini_json import JsonObjectScanner, json_dumps, json_loads
+
 try:
     from dotenv import load_dotenv
     _HAS_DOTENV = True
 except Exception:
     _HAS_DOTENV = False
 
-# Load environment variables from .env if possible; otherwise attempt a simple manual loader.
-if _HAS_DOTENV:
-    try:
-        load_dotenv()
-    except Exception:
-        pass
-else:
-    # manual parse of a .env file (KEY=VALUE lines)
-    env_path = ".env"
-    if os.path.exists(env_path):
+# .env is loaded on first use rather than at import, so importing this module has no side effects
+_ENV_LOADED = False
+_API_KEY = None
+
+
+def _load_env_once():
+    """Load .env (via python-dotenv or a simple KEY=VALUE parser) once and return the API key."""
+    global _ENV_LOADED, _API_KEY
+    if _ENV_LOADED:
+        return _API_KEY
+    _ENV_LOADED = True
+
+    if _HAS_DOTENV:
         try:
-            with open(env_path, "r", encoding="utf-8") as ef:
-                for line in ef:
-                    line = line.strip()
-                    if not line or line.startswith("#") or "=" not in line:
-                        continue
-                    k, v = line.split("=", 1)
-                    k = k.strip()
-                    v = v.strip().strip('"').strip("'")
-                    if k and k not in os.environ:
-                        os.environ[k] = v
+            load_dotenv()
         except Exception:
             pass
+    else:
+        # manual parse of a .env file (KEY=VALUE lines)
+        env_path = ".env"
+        if os.path.exists(env_path):
+            try:
+                with open(env_path, "r", encoding="utf-8") as ef:
+                    for line in ef:
+                        line = line.strip()
+                        if not line or line.startswith("#") or "=" not in line:
+                            continue
+                        k, v = line.split("=", 1)
+                        k = k.strip()
+                        v = v.strip().strip('"').strip("'")
+                        if k and k not in os.environ:
+                            os.environ[k] = v
+            except Exception:
+                pass
+
+    _API_KEY = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    return _API_KEY
+
+
+# JSON array inside a markdown code block, and the outermost [...] span of a response
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\[.*?\])\s*```', re.DOTALL)
+_BRACKET_RE = re.compile(r'\[.*\]', re.DOTALL)
+# Last-resort tokens: a short quoted string, or a bare word (Finnish letters included)
+_TOKEN_RE = re.compile(r'"([^"\n]{2,40})"|\b([A-Za-zÄÖÅåäö][\wÄÖÅåäö-]{1,40})\b')
+# Lines that start like JSON or a code fence; after the JSON attempts fail these are malformed JSON
+_JSON_LINE_RE = re.compile(r'^[ \t]*[\[{`].*$', re.MULTILINE)
+# Field names of a word entry, which must never be taken for words
+_FIELD_NAMES = frozenset({'word', 'translation', 'example', 'example_translation'})
 
 
 FALLBACK_VOCAB = {
@@ -58,14 +89,14 @@ FALLBACK_VOCAB = {
 }
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Generate Finnish word list using Gemini.")
     parser.add_argument("--topic", required=True, help="Topic name (e.g. weather, furniture)")
     parser.add_argument("--count", type=int, default=30, help="Number of words to generate")
     parser.add_argument("--model", default="gemini-2.5-flash", help="Gemini model name to use")
     parser.add_argument("--output", default="scripts/words.json", help="Output JSON file path")
     parser.add_argument("--api-key-env", default="GEMINI_API_KEY", help="Env var name for Gemini API key")
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def prompt_for_topic(topic: str, count: int) -> str:
@@ -93,17 +124,17 @@ DEFAULT_MODEL_CANDIDATES = [
 ]
 
 
-def try_genai_client_generate(prompt: str, model: str | list):
-    # Note: this function will attempt to read API key from the environment if present.
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Return a Gemini client shared by every call in this process, or None if it cannot be created."""
     try:
         from google import genai
-        from google.genai import types
     except Exception:
         return None
 
     try:
         # Prefer an explicit API key if provided in the environment
-        api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+        api_key = _load_env_once()
         # Some genai package versions expect configuring the library before creating a Client
         if api_key:
             try:
@@ -115,17 +146,23 @@ def try_genai_client_generate(prompt: str, model: str | list):
 
         # Create the client (most versions accept no args if configured)
         try:
-            client = genai.Client()
+            client = genai.Client(http_options=http_options())
         except TypeError:
             # Fallback: try passing api_key explicitly if constructor requires it
             if api_key:
-                client = genai.Client(api_key=api_key)
+                client = genai.Client(api_key=api_key, http_options=http_options())
             else:
                 raise
     except Exception as e:
         print(f"⚠️  genai.Client() initialization failed: {e}")
         return None
+    return client
+
 
+def try_genai_client_generate(prompt: str, model: str | list, client=None, expected_count: int | None = None):
+    # Note: this function will attempt to read API key from the environment if present.
+    # An existing client can be passed in to reuse it instead of creating a new one.
+    # With expected_count, streaming stops once that many unique word entries have been parsed.
     # Allow passing either a single model name or a list of candidate models
     models_to_try = []
     if isinstance(model, list):
@@ -135,35 +172,69 @@ def try_genai_client_generate(prompt: str, model: str | list):
     else:
         models_to_try = DEFAULT_MODEL_CANDIDATES
 
+    # Cached responses are usable even when no client or API key is available
+    for candidate in models_to_try:
+        cached = cache_lookup(candidate, prompt)
+        if cached is not None:
+            print(f"♻️ genai: using cached response for model '{candidate}'")
+            return cached
+
+    try:
+        from google.genai import types
+    except Exception:
+        return None
+
+    if client is None:
+        client = _get_client()
+        if client is None:
+            return None
+
     for candidate in models_to_try:
         try:
             config = types.GenerateContentConfig(response_modalities=[types.Modality.TEXT])
-            response = client.models.generate_content(model=candidate, contents=[prompt], config=config)
-
-            if not getattr(response, "candidates", None):
-                continue
-
-            first = response.candidates[0]
-            content = getattr(first, "content", None)
-            if not content:
-                continue
-
-            parts = getattr(content, "parts", None)
-            if parts:
-                texts = []
-                for p in parts:
-                    t = getattr(p, "text", None)
-                    if t:
-                        texts.append(t)
-                if texts:
-                    print(f"✅ genai: succeeded with model '{candidate}'")
-                    return "\n".join(texts)
-
-            # As a last resort return string conversion if non-empty
-            s = str(response)
-            if s:
-                print(f"✅ genai: succeeded with model '{candidate}' (string response)")
-                return s
+            # Stream the response so entries can be parsed as they arrive and the request
+            # can stop as soon as enough unique words have been received
+            stream = client.models.generate_content_stream(model=candidate, contents=[prompt], config=config)
+            texts = []
+            scanner = JsonObjectScanner()
+            items = []
+            seen_words = set()
+            try:
+                for chunk in stream:
+                    t = getattr(chunk, "text", None)
+                    if not t:
+                        continue
+                    texts.append(t)
+                    if expected_count is None:
+                        continue
+                    for obj in scanner.feed(t):
+                        for item in _coerce_items([obj], 1):
+                            if item['word'].lower() not in seen_words:
+                                seen_words.add(item['word'].lower())
+                                items.append(item)
+                    if len(items) >= expected_count:
+                        break
+            finally:
+                close = getattr(stream, "close", None)
+                if callable(close):
+                    close()
+
+            if expected_count is not None and len(items) >= expected_count:
+                print(f"✅ genai: succeeded with model '{candidate}' (stopped after {len(items)} words)")
+                text = json_dumps(items).decode("utf-8")
+                cache_store(candidate, prompt, text)
+                return text
+
+            if texts:
+                print(f"✅ genai: succeeded with model '{candidate}'")
+                text = "".join(texts)
+                cache_store(candidate, prompt, text)
+                return text
+
+            # No text parts came back; try the next candidate model rather than returning the
+            # response repr, which would only fail to parse and end up in the cache
+            print(f"⚠️ genai model '{candidate}' returned no text")
+            continue
         except Exception as e:
             # Try next candidate model on errors such as model-not-found
             print(f"⚠️ genai model '{candidate}' failed: {e}")
@@ -180,7 +251,7 @@ def try_generativeai_package(prompt: str, model: str):
         return None
 
     try:
-        api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+        api_key = _load_env_once()
         if api_key:
             try:
                 generativeai.configure(api_key=api_key)
@@ -204,126 +275,87 @@ def try_generativeai_package(prompt: str, model: str):
         if isinstance(resp, dict):
             for k in ("output", "candidates", "content", "text"):
                 if k in resp:
-                    return json.dumps(resp[k])
+                    return json_dumps(resp[k]).decode("utf-8")
         return str(resp)
     except Exception as e:
         print(f"⚠️  google.generativeai call failed: {e}")
         return None
 
 
+def _coerce_items(data, expected_count: int) -> List[dict]:
+    """Convert a parsed JSON array into {word, translation, example, example_translation} dicts.
+    Dicts missing a required field are skipped; bare strings become placeholder entries.
+    """
+    if not isinstance(data, list):
+        return []
+    result = []
+    for item in data:
+        if isinstance(item, dict) and 'word' in item and 'translation' in item and 'example' in item:
+            result.append({
+                'word': str(item['word']).strip(),
+                'translation': str(item['translation']).strip(),
+                'example': str(item['example']).strip(),
+                'example_translation': str(item.get('example_translation', item['example'])).strip()
+            })
+        elif isinstance(item, str):
+            result.append({
+                'word': item.strip(),
+                'translation': item.strip(),
+                'example': f'Tämä on {item}.',
+                'example_translation': f'This is {item}.'
+            })
+    return result[:expected_count]
+
+
+def _json_candidates(text: str):
+    """Yield substrings of a model response that may hold the JSON array, most specific first."""
+    fence_match = _JSON_FENCE_RE.search(text)
+    if fence_match:
+        yield fence_match.group(1)
+    yield text
+    bracket_match = _BRACKET_RE.search(text)
+    if bracket_match:
+        yield bracket_match.group(0)
+
+
 def parse_words_from_text(text: str, expected_count: int) -> List[dict]:
     """Parse text and return list of {word, translation, example, example_translation} dicts."""
-    # First, try to extract JSON from markdown code blocks (```json ... ```)
-    import re as regex_module
-    json_match = regex_module.search(r'```(?:json)?\s*(\[.*?\])\s*```', text, regex_module.DOTALL)
-    if json_match:
+    # Try, in order: JSON inside a markdown code block (```json ... ```), the whole text as JSON,
+    # and the outermost [...] span in the text. The first attempt that yields entries wins.
+    for candidate in _json_candidates(text):
         try:
-            data = json.loads(json_match.group(1))
-            if isinstance(data, list):
-                result = []
-                for item in data:
-                    if isinstance(item, dict) and 'word' in item and 'translation' in item and 'example' in item:
-                        result.append({
-                            'word': str(item['word']).strip(),
-                            'translation': str(item['translation']).strip(),
-                            'example': str(item['example']).strip(),
-                            'example_translation': str(item.get('example_translation', item['example'])).strip()
-                        })
-                if result:
-                    return result[:expected_count]
+            result = _coerce_items(json_loads(candidate), expected_count)
         except Exception:
-            pass
-
-    # Try direct JSON parsing
-    try:
-        data = json.loads(text)
-        if isinstance(data, list):
-            result = []
-            for item in data:
-                if isinstance(item, dict) and 'word' in item and 'translation' in item and 'example' in item:
-                    result.append({
-                        'word': str(item['word']).strip(),
-                        'translation': str(item['translation']).strip(),
-                        'example': str(item['example']).strip(),
-                        'example_translation': str(item.get('example_translation', item['example'])).strip()
-                    })
-                elif isinstance(item, str):
-                    result.append({
-                        'word': item.strip(),
-                        'translation': item.strip(),
-                        'example': f'Tämä on {item}.',
-                        'example_translation': f'This is {item}.'
-                    })
-            if result:
-                return result[:expected_count]
-    except Exception:
-        pass
-
-    # Fallback: try to find JSON array in text
-    try:
-        bracket_start = text.find('[')
-        bracket_end = text.rfind(']')
-        if bracket_start >= 0 and bracket_end > bracket_start:
-            json_str = text[bracket_start:bracket_end + 1]
-            data = json.loads(json_str)
-            if isinstance(data, list):
-                result = []
-                for item in data:
-                    if isinstance(item, dict) and 'word' in item and 'translation' in item and 'example' in item:
-                        result.append({
-                            'word': str(item['word']).strip(),
-                            'translation': str(item['translation']).strip(),
-                            'example': str(item['example']).strip(),
-                            'example_translation': str(item.get('example_translation', item['example'])).strip()
-                        })
-                if result:
-                    return result[:expected_count]
-    except Exception:
-        pass
-
-    # Last resort: parse text lines for word patterns
-    tokens = []
-    for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith('`') or line.startswith('[') or line.startswith('{'):
             continue
-        if line[0].isdigit():
-            parts = line.split(".", 1)
-            if len(parts) == 2:
-                line = parts[1].strip()
-
-        for part in line.split(","):
-            w = part.strip().strip('"').strip("'")
-            if w and len(w) > 1 and not w.startswith('{') and not w.startswith('['):
-                tokens.append(w)
-
-    seen = set()
-    out = []
-    for t in tokens:
-        if t not in seen:
-            seen.add(t)
-            out.append({
-                'word': t,
-                'translation': t,
-                'example': f'Tämä on {t}.',
-                'example_translation': f'This is {t}.'
-            })
-        if len(out) >= expected_count:
-            break
-    return out
-
-
-def main():
-    args = parse_args()
-
+        if result:
+            return result
+
+    # Last resort: pull quoted strings or bare words out of the non-JSON lines of the text
+    prose = _JSON_LINE_RE.sub('', text)
+    raw = (quoted or bare for quoted, bare in _TOKEN_RE.findall(prose))
+    tokens = list(dict.fromkeys(t for t in raw if t not in _FIELD_NAMES))[:expected_count]
+    return [
+        {
+            'word': t,
+            'translation': t,
+            'example': f'Tämä on {t}.',
+            'example_translation': f'This is {t}.'
+        }
+        for t in tokens
+    ]
+
+
+def run(args, client=None):
+    """Generate and save a word list. An existing Gemini client can be passed in to reuse it."""
     topic = args.topic
     count = args.count
     model = args.model
 
+    _load_env_once()
     prompt = prompt_for_topic(topic, count)
 
     print("➡️ Attempting to generate words using the installed Gemini client...")
-    text = try_genai_client_generate(prompt, model)
+    text = try_genai_client_generate(prompt, model, client=client, expected_count=count)
 
     if not text:
         print("➡️ genai client not available or failed — trying google.generativeai package...")
@@ -364,11 +396,15 @@ def main():
     out_dir = os.path.dirname(args.output) or "."
     os.makedirs(out_dir, exist_ok=True)
 
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(words, f, ensure_ascii=False, indent=2)
+    with open(args.output, "wb") as f:
+        f.write(json_dumps(words))
 
     print(f"✅ Wrote {len(words)} unique words (with translations and examples) for topic '{topic}' to {args.output}")
 
 
+def main():
+    run(parse_args())
+
+
 if __name__ == "__main__":
     main()
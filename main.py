@@ -11,27 +11,64 @@ Usage:
 """
 
 import argparse
-import subprocess
 import sys
 import os
+import threading
 from pathlib import Path
 
+# Stage modules are imported in the branch that runs them, so `--help` and `--text-only` do not load
+# google-genai (or require it to be installed)
 
-def run_command(cmd, description):
-    """Run a command and handle errors."""
+# Topics a user is likely to request next; their word lists are prefetched into the response cache
+RELATED_TOPICS = {
+    "weather": ["seasons", "clothing"],
+    "seasons": ["weather", "holidays"],
+    "clothing": ["weather", "shopping"],
+    "food": ["kitchen", "restaurant"],
+    "kitchen": ["food", "furniture"],
+    "restaurant": ["food", "drinks"],
+    "furniture": ["home", "kitchen"],
+    "home": ["furniture", "family"],
+    "animals": ["nature", "farm"],
+    "nature": ["animals", "weather"],
+    "travel": ["transport", "city"],
+    "transport": ["travel", "city"],
+}
+
+
+def run_stage(description, run, args, **kwargs):
+    """Run a pipeline stage in-process and handle errors."""
     print(f"\n{'='*60}")
     print(f"🚀 {description}")
-    print(f"{'='*60}")
-    print(f"Running: {' '.join(cmd)}\n")
-    
-    result = subprocess.run(cmd, capture_output=False, text=True)
+    print(f"{'='*60}\n")
     
-    if result.returncode != 0:
-        print(f"\n❌ Error: {description} failed with exit code {result.returncode}")
-        sys.exit(1)
+    try:
+        run(args, **kwargs)
+    except SystemExit as e:
+        # Stages call sys.exit() on fatal errors, exactly as when run as scripts
+        if e.code not in (None, 0):
+            print(f"\n❌ Error: {description} failed with exit code {e.code}")
+            sys.exit(1)
     
     print(f"\n✅ {description} completed successfully!")
-    return result
+
+
+def prefetch_related_words(topic, args_words, client, stop):
+    """Populate the response cache with word lists for topics related to `topic`.
+
+    Runs in a background thread while illustrations are generated. No new topic is started
+    once `stop` is set; a request still in flight is abandoned when the pipeline exits.
+    """
+    from generate_word_list import prompt_for_topic, try_genai_client_generate
+
+    for related in RELATED_TOPICS.get(topic.lower(), []):
+        if stop.is_set():
+            return
+        prompt = prompt_for_topic(related, args_words.count)
+        try:
+            try_genai_client_generate(prompt, args_words.model, client=client, expected_count=args_words.count)
+        except Exception as e:
+            print(f"⚠️ Prefetch for topic '{related}' failed: {e}")
 
 
 def main():
@@ -60,6 +97,11 @@ def main():
         action="store_true",
         help="Only regenerate text overlays on existing illustrations (skips word generation and image generation)"
     )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="While illustrations are generated, also fetch word lists for related topics into the response cache (extra API requests)"
+    )
     args = parser.parse_args()
     
     topic = args.topic
@@ -98,56 +140,66 @@ def main():
             print(f"   Run without --text-only first to generate illustrations.")
             sys.exit(1)
     else:
+        from generate_caption import get_genai_client, parse_args as parse_caption_args, run as run_caption
+        from generate_illustrations import parse_args as parse_illustration_args, run as run_illustrations
+        from generate_word_list import parse_args as parse_words_args, run as run_words
+        from verify_grammar import parse_args as parse_grammar_args, run as run_grammar
+
+        # One Gemini client (and its HTTP connection pool) is shared by every stage
+        client = get_genai_client()
+
         # Step 1: Generate word list
-        cmd_words = [
-            sys.executable,
-            "generate_word_list.py",
+        args_words = parse_words_args([
             "--topic", topic,
             "--count", str(count),
             "--output", str(words_json)
-        ]
-        run_command(cmd_words, f"Step 1/4: Generating {count} Finnish words for topic '{topic}'")
+        ])
+        run_stage(f"Step 1/4: Generating {count} Finnish words for topic '{topic}'", run_words, args_words, client=client)
         
         # Step 2: Verify and fix grammar
-        cmd_grammar = [
-            sys.executable,
-            "verify_grammar.py",
+        args_grammar = parse_grammar_args([
             "--words-json", str(words_json)
-        ]
-        run_command(cmd_grammar, f"Step 2/4: Verifying Finnish grammar and naturalness")
+        ])
+        run_stage(f"Step 2/4: Verifying Finnish grammar and naturalness", run_grammar, args_grammar, client=client)
         
         # Step 3: Generate illustrations
-        cmd_illustrations = [
-            sys.executable,
-            "generate_illustrations.py",
+        args_illustrations = parse_illustration_args([
             "--words-json", str(words_json),
             "--topic", topic,
             "--aspect", "9:16"
-        ]
-        run_command(cmd_illustrations, f"Step 3/4: Generating illustrations for '{topic}'")
+        ])
+        # Illustration generation dominates the run time, so prefetch related word lists meanwhile
+        stop_prefetch = threading.Event()
+        if args.prefetch and RELATED_TOPICS.get(topic.lower()):
+            print(f"🔮 Prefetching word lists in the background for: {', '.join(RELATED_TOPICS[topic.lower()])}")
+            threading.Thread(
+                target=prefetch_related_words,
+                args=(topic, args_words, client, stop_prefetch),
+                daemon=True
+            ).start()
+        run_stage(f"Step 3/4: Generating illustrations for '{topic}'", run_illustrations, args_illustrations, client=client)
+        stop_prefetch.set()
     
     # Step 4: Add text overlay (always runs)
+    from add_text_to_illustrations import parse_args as parse_text_args, run as run_text
+
     step_label = "Step 1/1" if text_only else "Step 4/4"
-    cmd_text = [
-        sys.executable,
-        "add_text_to_illustrations.py",
+    args_text = parse_text_args([
         "--input-dir", str(illustrations_dir),
         "--words-json", str(words_json),
         "--output-dir", str(output_dir),
         "--font-size", str(font_size)
-    ]
-    run_command(cmd_text, f"{step_label}: Adding text overlays to illustrations")
+    ])
+    run_stage(f"{step_label}: Adding text overlays to illustrations", run_text, args_text)
 
     if not text_only:
         # Step 5: Generate TikTok caption
         caption_file = scripts_dir / f"caption_{topic}.txt"
-        cmd_caption = [
-            sys.executable,
-            "generate_caption.py",
+        args_caption = parse_caption_args([
             "--topic", topic,
             "--output", str(caption_file)
-        ]
-        run_command(cmd_caption, f"Step 5/5: Generating TikTok caption")
+        ])
+        run_stage(f"Step 5/5: Generating TikTok caption", run_caption, args_caption, client=client)
     
     # Success message
     print(f"\n{'='*60}")
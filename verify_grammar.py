@@ -10,50 +10,65 @@ Usage:
 """
 
 import argparse
-import json
+import asyncio
+import functools
 import os
+from typing import Literal
+
+# pydantic (used by google-genai to build response_schema) rejects typing.TypedDict before Python 3.12
+from typing_extensions import TypedDict
+
 try:
     from dotenv import load_dotenv
     _HAS_DOTENV = True
 except ImportError:
     _HAS_DOTENV = False
 
-# Load environment variables
-if _HAS_DOTENV:
-    load_dotenv()
+# google-genai is imported where a client or request config is built, and .env is loaded only when
+# an API key is needed, so importing this module (e.g. from main.py) has no side effects
 
-from google import genai
-from google.genai import types
+from gemini_cache import cache_lookup, cache_store
+from gemini_http import http_options
+from gemini_json import JsonObjectScanner, json_dumps, json_loads
 
+VERIFY_MODEL = 'gemini-2.0-flash-exp'
+# Bump when the verification prompts or the Correction schema change, so cached results are not reused
+ENTRY_CACHE_VERSION = 1
 
-def verify_and_fix_grammar(words_data: list, api_key: str = None) -> tuple[list, list]:
-    """
-    Verify Finnish grammar and naturalness of words and example sentences.
-    Returns: (corrected_words_data, issues_found)
-    """
-    if api_key is None:
-        api_key = os.getenv("GEMINI_API_KEY")
-    
-    if not api_key:
-        print("⚠️ No API key found. Skipping grammar verification.")
-        return words_data, []
-    
-    # Initialize Gemini client
-    client = genai.Client(api_key=api_key)
-    
-    issues = []
-    corrected_data = []
-    
-    print(f"\n🔍 Verifying grammar for {len(words_data)} words...\n")
-    
-    for idx, item in enumerate(words_data, 1):
-        word = item.get('word', '')
-        translation = item.get('translation', '')
-        example = item.get('example', '')
-        example_translation = item.get('example_translation', '')
-        
-        # Create verification prompt
-        prompt = f"""You are a Finnish language expert. Verify this vocabulary entry for a {'' if idx == 1 else 'lesson about the topic'}.
+
+class Correction(TypedDict):
+    """Structured verification result for one vocabulary entry."""
+    status: Literal["CORRECT", "FIXED"]
+    word: str
+    translation: str
+    example: str
+    example_translation: str
+    issues: str
+
+
+class BatchCorrection(Correction):
+    """Verification result for one entry of a batched request, tagged with its 1-based index."""
+    index: int
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client(api_key: str | None = None):
+    """Return a Gemini client shared by every verification in this process."""
+    from google import genai
+
+    if api_key:
+        return genai.Client(api_key=api_key, http_options=http_options())
+    return genai.Client(http_options=http_options())
+
+
+def _build_verification_prompt(idx: int, item: dict) -> str:
+    """Build the grammar verification prompt for one vocabulary entry."""
+    word = item.get('word', '')
+    translation = item.get('translation', '')
+    example = item.get('example', '')
+    example_translation = item.get('example_translation', '')
+
+    return f"""You are a Finnish language expert. Verify this vocabulary entry for a {'' if idx == 1 else 'lesson about the topic'}.
 
 Word: {word}
 English Translation: {translation}
@@ -68,86 +83,289 @@ Check for these issues:
 5. Does the example use the word meaningfully (not just 'Tämä on...' format)?
 6. Does the English translation match the Finnish example?
 
-If EVERYTHING is correct, respond with exactly: CORRECT
+Return an object with fields {{"status", "word", "translation", "example", "example_translation", "issues"}}
+where "status" is "CORRECT" if everything is correct (copy the fields unchanged and leave "issues" empty)
+or "FIXED" if there were ANY issues (give the corrected fields and explain what was wrong in "issues")."""
+
+
+def _build_batch_verification_prompt(words_data: list, indices: list) -> str:
+    """Build one grammar verification prompt covering the entries at the given 1-based indices."""
+    entries = [
+        {
+            'index': idx,
+            'word': item.get('word', ''),
+            'translation': item.get('translation', ''),
+            'example': item.get('example', ''),
+            'example_translation': item.get('example_translation', ''),
+        }
+        for idx, item in ((idx, words_data[idx - 1]) for idx in indices)
+    ]
 
-If there are ANY issues, provide corrections in this JSON format:
-{{
-  "word": "corrected_word",
-  "translation": "corrected_translation",  
-  "example": "natural_example_sentence_in_Finnish",
-  "example_translation": "corrected_English_translation",
-  "issues": "Explanation of what was wrong"
-}}"""
+    return f"""You are a Finnish language expert. Verify these vocabulary entries for a lesson about the topic.
 
+For each entry check for these issues:
+1. Is this a real Finnish word (not a placeholder like 'esimerkki', 'sana', 'lukeminen', 'kirja')?
+2. Is the Finnish word spelled correctly?
+3. Does the English translation accurately match the Finnish word?
+4. Is the Finnish example sentence grammatically correct and natural?
+5. Does the example use the word meaningfully (not just 'Tämä on...' format)?
+6. Does the English translation match the Finnish example?
+
+Check the following JSON array. For each entry return an object with fields
+{{"index", "status", "word", "translation", "example", "example_translation", "issues"}}
+where "status" is "CORRECT" if everything is correct (copy the fields unchanged and leave "issues" empty)
+or "FIXED" if there were ANY issues (give the corrected fields and explain what was wrong in "issues").
+Return a JSON array only.
+
+{json_dumps(entries).decode("utf-8")}"""
+
+
+def _apply_correction(idx: int, item: dict, correction: dict, total: int) -> tuple[dict, dict]:
+    """Merge a correction from the model into an entry. Returns: (corrected_item, issue)."""
+    word = item.get('word', '')
+    issue_msg = correction.get('issues') or 'Grammar issues found'
+    issue = {
+        'index': idx,
+        'word': word,
+        'issue': issue_msg,
+        'correction': correction
+    }
+    
+    print(f"⚠️  [{idx}/{total}] {word} - CORRECTED")
+    print(f"   Issue: {issue_msg}")
+    
+    # Use corrected data
+    corrected_item = {
+        'word': correction.get('word', word),
+        'translation': correction.get('translation', item.get('translation', '')),
+        'example': correction.get('example', item.get('example', '')),
+        'example_translation': correction.get('example_translation', item.get('example_translation', ''))
+    }
+    return corrected_item, issue
+
+
+def _entry_cache_key(item: dict) -> str:
+    """Cache key for one entry's verification: its fields plus the prompt/schema version, not its position."""
+    fields = [item.get(k, '') for k in ('word', 'translation', 'example', 'example_translation')]
+    return f"verify-entry:{ENTRY_CACHE_VERSION}:" + json_dumps(fields).decode("utf-8")
+
+
+def _use_correction(idx: int, item: dict, correction: dict, total: int) -> tuple[dict, dict | None] | None:
+    """Turn a CORRECT/FIXED answer into (corrected_item, issue); None if the status is neither."""
+    status = str(correction.get('status', '')).upper()
+    if status == 'CORRECT':
+        print(f"✅ [{idx}/{total}] {item.get('word', '')} - Grammar OK")
+        return item, None
+    if status == 'FIXED':
+        return _apply_correction(idx, item, correction, total)
+    return None
+
+
+def _cached_result(idx: int, item: dict, total: int) -> tuple[dict, dict | None] | None:
+    """Return the result of an earlier verification of this exact entry, or None on a cache miss."""
+    cached = cache_lookup(VERIFY_MODEL, _entry_cache_key(item))
+    if cached is None:
+        return None
+    try:
+        correction = json_loads(cached)
+    except ValueError:
+        return None
+    if not isinstance(correction, dict):
+        return None
+    return _use_correction(idx, item, correction, total)
+
+
+def _store_result(idx: int, item: dict, correction: dict):
+    """Cache the model's answer for one entry under that entry's own key."""
+    entry = {k: v for k, v in correction.items() if k != 'index'}
+    cache_store(VERIFY_MODEL, _entry_cache_key(item), json_dumps(entry).decode("utf-8"))
+
+
+async def _verify_batch(client, words_data: list, indices: list) -> dict:
+    """
+    Verify the entries at the given 1-based indices with a single streamed request;
+    entries are handled (and cached individually) as soon as they arrive.
+    Returns: {index: (corrected_item, issue)} for the entries the model answered;
+    missing or malformed entries are left out so the caller can retry them individually.
+    """
+    from google.genai import types
+
+    total = len(words_data)
+    prompt = _build_batch_verification_prompt(words_data, indices)
+    requested = set(indices)
+    scanner = JsonObjectScanner()
+    results = {}
+
+    def handle(entry):
         try:
-            response = client.models.generate_content(
-                model='gemini-2.0-flash-exp',
-                contents=[prompt],
-                config=types.GenerateContentConfig(
-                    temperature=0.1,
-                    response_mime_type="text/plain"
-                )
+            idx = int(entry.get('index'))
+        except (TypeError, ValueError):
+            return
+        if idx not in requested or idx in results:
+            return
+
+        item = words_data[idx - 1]
+        result = _use_correction(idx, item, entry, total)
+        if result is not None:
+            results[idx] = result
+            _store_result(idx, item, entry)
+
+    try:
+        stream = await client.aio.models.generate_content_stream(
+            model=VERIFY_MODEL,
+            contents=[prompt],
+            config=types.GenerateContentConfig(
+                temperature=0.1,
+                response_mime_type="application/json",
+                response_schema=list[BatchCorrection]
             )
-            
-            result = response.text.strip()
-            
-            if "CORRECT" in result:
-                print(f"✅ [{idx}/{len(words_data)}] {word} - Grammar OK")
-                corrected_data.append(item)
-            else:
-                # Try to parse JSON correction
-                try:
-                    # Extract JSON from response
-                    json_start = result.find('{')
-                    json_end = result.rfind('}') + 1
-                    if json_start >= 0 and json_end > json_start:
-                        json_str = result[json_start:json_end]
-                        correction = json.loads(json_str)
-                        
-                        issue_msg = correction.get('issues', 'Grammar issues found')
-                        issues.append({
-                            'index': idx,
-                            'word': word,
-                            'issue': issue_msg,
-                            'correction': correction
-                        })
-                        
-                        print(f"⚠️  [{idx}/{len(words_data)}] {word} - CORRECTED")
-                        print(f"   Issue: {issue_msg}")
-                        
-                        # Use corrected data
-                        corrected_item = {
-                            'word': correction.get('word', word),
-                            'translation': correction.get('translation', translation),
-                            'example': correction.get('example', example),
-                            'example_translation': correction.get('example_translation', example_translation)
-                        }
-                        corrected_data.append(corrected_item)
-                    else:
-                        # Couldn't parse correction, keep original
-                        print(f"⚠️  [{idx}/{len(words_data)}] {word} - Could not parse correction, keeping original")
-                        corrected_data.append(item)
-                except json.JSONDecodeError:
-                    print(f"⚠️  [{idx}/{len(words_data)}] {word} - Could not parse correction, keeping original")
-                    corrected_data.append(item)
-                    
-        except Exception as e:
-            print(f"❌ [{idx}/{len(words_data)}] {word} - Error during verification: {e}")
-            corrected_data.append(item)
+        )
+        async for chunk in stream:
+            text = getattr(chunk, "text", None)
+            if not text:
+                continue
+            for entry in scanner.feed(text):
+                handle(entry)
+    except Exception as e:
+        print(f"⚠️  Batched verification failed: {e}")
+        return results
+
+    if not results:
+        print("⚠️  Could not parse batched verification response")
+    return results
+
+
+async def _verify_one(client, idx: int, item: dict, total: int) -> tuple[dict, dict | None]:
+    """
+    Verify a single vocabulary entry.
+    Returns: (corrected_item, issue) where issue is None if no correction was applied.
+    """
+    from google.genai import types
+
+    word = item.get('word', '')
+    prompt = _build_verification_prompt(idx, item)
+
+    try:
+        response = await client.aio.models.generate_content(
+            model=VERIFY_MODEL,
+            contents=[prompt],
+            config=types.GenerateContentConfig(
+                temperature=0.1,
+                response_mime_type="application/json",
+                response_schema=Correction
+            )
+        )
+        
+        # The SDK validates the JSON against the schema and returns it as a dict
+        correction = response.parsed
+        if not isinstance(correction, dict):
+            raise ValueError("response did not match the correction schema")
+        _store_result(idx, item, correction)
+        
+        if correction.get('status') == 'CORRECT':
+            print(f"✅ [{idx}/{total}] {word} - Grammar OK")
+            return item, None
+
+        return _apply_correction(idx, item, correction, total)
+                
+    except Exception as e:
+        print(f"❌ [{idx}/{total}] {word} - Error during verification: {e}")
+        return item, None
+
+
+async def verify_and_fix_grammar(
+    words_data: list,
+    api_key: str = None,
+    max_concurrency: int = 8,
+    client=None,
+) -> tuple[list, list]:
+    """
+    Verify Finnish grammar and naturalness of words and example sentences.
+    Entries already in the response cache are not sent again. The rest are checked in a single batched
+    request; any entries missing from or malformed in that response are re-checked individually and concurrently (at most max_concurrency requests in flight).
+    Output order matches the input.
+    Returns: (corrected_words_data, issues_found)
+    """
+    total = len(words_data)
+    print(f"\n🔍 Verifying grammar for {total} words...\n")
     
-    # Final duplicate check - remove any duplicates that slipped through
+    # Duplicate input words are never sent to the API
     seen_words = set()
-    final_data = []
+    to_check = []
     duplicates_removed = 0
+    for idx, item in enumerate(words_data, 1):
+        word_lower = item.get('word', '').lower()
+        if word_lower in seen_words:
+            duplicates_removed += 1
+            print(f"⚠️  Removed duplicate: {item.get('word', '')}")
+            continue
+        seen_words.add(word_lower)
+        to_check.append(idx)
+
+    # Entries verified by an earlier run are answered from the cache, so only new or edited entries
+    # reach the network
+    results = {}
+    for idx in to_check:
+        cached = _cached_result(idx, words_data[idx - 1], total)
+        if cached is not None:
+            results[idx] = cached
+    misses = [idx for idx in to_check if idx not in results]
+
+    if misses and client is None:
+        if api_key is None:
+            if _HAS_DOTENV:
+                load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY")
+        
+        if api_key:
+            # Reuse the process-wide Gemini client
+            client = _get_client(api_key)
+        else:
+            print(f"⚠️ No API key found. Skipping grammar verification for {len(misses)} uncached entr{'y' if len(misses) == 1 else 'ies'}.")
+            results.update((idx, (words_data[idx - 1], None)) for idx in misses)
+            misses = []
+
+    # Check the remaining entries in one request first, then retry only the entries it did not answer
+    batched = await _verify_batch(client, words_data, misses) if len(misses) > 1 else {}
+    results.update(batched)
+    pending = [idx for idx in misses if idx not in batched]
+    if batched and pending:
+        print(f"\n⚠️  Batched verification skipped {len(pending)} entr{'y' if len(pending) == 1 else 'ies'}; checking them individually...\n")
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def guarded(idx, item):
+        async with semaphore:
+            return await _verify_one(client, idx, item, total)
+
+    retried = await asyncio.gather(
+        *(guarded(idx, words_data[idx - 1]) for idx in pending),
+        return_exceptions=True
+    )
+    results.update(zip(pending, retried))
     
-    for item in corrected_data:
-        word_lower = item['word'].lower()
-        if word_lower not in seen_words:
-            seen_words.add(word_lower)
-            final_data.append(item)
+    # Collect results in input order, dropping entries whose *corrected* word duplicates an earlier one
+    issues = []
+    final_data = []
+    seen_words = set()
+    for idx in to_check:
+        item = words_data[idx - 1]
+        result = results[idx]
+        if isinstance(result, BaseException):
+            print(f"❌ [{idx}/{total}] {item.get('word', '')} - Error during verification: {result}")
+            corrected_item, issue = item, None
         else:
+            corrected_item, issue = result
+        
+        word_lower = corrected_item.get('word', '').lower()
+        if word_lower in seen_words:
             duplicates_removed += 1
-            print(f"⚠️  Removed duplicate: {item['word']}")
+            print(f"⚠️  Removed duplicate: {corrected_item.get('word', '')}")
+            continue
+        seen_words.add(word_lower)
+        final_data.append(corrected_item)
+        if issue is not None:
+            issues.append(issue)
     
     if duplicates_removed > 0:
         print(f"\n⚠️  Removed {duplicates_removed} duplicate word(s) during verification")
@@ -155,20 +373,25 @@ If there are ANY issues, provide corrections in this JSON format:
     return final_data, issues
 
 
-def main():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Verify and fix Finnish grammar in word lists.")
     parser.add_argument("--words-json", required=True, help="Path to words JSON file to verify.")
     parser.add_argument("--output", help="Optional output path for corrected JSON (defaults to overwriting input).")
     parser.add_argument("--report", help="Optional path to save grammar issues report.")
-    args = parser.parse_args()
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of entries to verify in parallel (default 8).")
+    return parser.parse_args(argv)
+
+
+def run(args, client=None):
+    """Verify a words JSON file. An existing Gemini client can be passed in to reuse it."""
     
     words_json = args.words_json
     output_path = args.output or words_json
     
     # Load words data
     try:
-        with open(words_json, 'r', encoding='utf-8') as f:
-            words_data = json.load(f)
+        with open(words_json, 'rb') as f:
+            words_data = json_loads(f.read())
     except Exception as e:
         print(f"❌ Error loading {words_json}: {e}")
         return
@@ -178,12 +401,14 @@ def main():
         return
     
     # Verify and fix grammar
-    corrected_data, issues = verify_and_fix_grammar(words_data)
+    corrected_data, issues = asyncio.run(
+        verify_and_fix_grammar(words_data, max_concurrency=args.concurrency, client=client)
+    )
     
     # Save corrected data
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(corrected_data, f, ensure_ascii=False, indent=2)
+        with open(output_path, 'wb') as f:
+            f.write(json_dumps(corrected_data))
         print(f"\n✅ Saved verified/corrected data to {output_path}")
     except Exception as e:
         print(f"\n❌ Error saving corrected data: {e}")
@@ -206,8 +431,8 @@ def main():
     # Save report if requested
     if args.report and issues:
         try:
-            with open(args.report, 'w', encoding='utf-8') as f:
-                json.dump(issues, f, ensure_ascii=False, indent=2)
+            with open(args.report, 'wb') as f:
+                f.write(json_dumps(issues))
             print(f"\n📄 Saved detailed report to {args.report}")
         except Exception as e:
             print(f"\n⚠️ Could not save report: {e}")
@@ -215,5 +440,9 @@ def main():
     print(f"{'='*60}\n")
 
 
+def main():
+    run(parse_args())
+
+
 if __name__ == "__main__":
     main()